@@ -6,15 +6,12 @@ https://github.com/patsluth/apsystems-api
 """
 import asyncio
 import logging
-from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core_config import Config
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from .api import APSystemsApiSystemSummaryClient
 from .coordinator import APSystemsApiSystemSummaryDataUpdateCoordinator
@@ -26,8 +23,6 @@ from .const import DOMAIN
 from .const import PLATFORMS
 from .const import STARTUP_MESSAGE
 
-SCAN_INTERVAL = timedelta(minutes=60)
-
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
@@ -1,28 +1,50 @@
 """Sample API Client."""
 import asyncio
 import base64
+import functools
 import hashlib
 import hmac
-import json
 import logging
+import math
 import typing
+from array import array
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date
 from urllib.parse import urljoin
-from uuid import uuid4
-import argparse
-import os
+import secrets
 import socket
+import time
 
 import aiohttp
 import async_timeout
+import orjson
 
 TIMEOUT = 10
+# Seconds a fetched payload is served from memory before hitting the API again.
+CACHE_TTL = 10
+# Seconds a previous payload may still be served when a fresh fetch fails.
+CACHE_MAX_STALE = 2 * 60 * 60
+SIGNATURE_METHOD = "HmacSHA256"
 
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
+def _sample(value) -> float:
+    """Parse one minutely sample, mapping missing or garbled values to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _latest_sample(samples: "array[float]") -> float | None:
+    """Return the last sample, or None when there is none or it is NaN."""
+    if not samples or math.isnan(samples[-1]):
+        return None
+    return samples[-1]
+
+
 class APSystemsApiResponseException(Exception):
     pass
 
@@ -35,20 +57,44 @@ class APSystemsApiBase:
         year: str
         lifetime: str
 
+        @classmethod
+        def from_api(cls, data: dict) -> "APSystemsApiBase.SystemSummaryData":
+            return cls(
+                today=data["today"],
+                month=data["month"],
+                year=data["year"],
+                lifetime=data["lifetime"],
+            )
+
     @dataclass
     class ECUMinutelyEnergyData:
         today: str
         time: typing.List[str]
-        power: typing.List[int]
-        energy: typing.List[str]
+        # Typed arrays keep the up to 1440 daily samples unboxed. Samples the
+        # API returns as null or non-numeric are stored as NaN.
+        power: "array[float]"
+        energy: "array[float]"
+
+        @classmethod
+        def from_api(cls, data: dict) -> "APSystemsApiBase.ECUMinutelyEnergyData":
+            return cls(
+                today=data["today"],
+                time=data["time"],
+                power=array("d", map(_sample, data["power"])),
+                energy=array("d", map(_sample, data["energy"])),
+            )
 
         @property
-        def latest_power(self) -> str:
-            return self.power[-1]
+        def latest_power(self) -> float | None:
+            return _latest_sample(self.power)
 
         @property
-        def latest_energy(self) -> str:
-            return self.energy[-1]
+        def latest_energy(self) -> float | None:
+            return _latest_sample(self.energy)
+
+        @property
+        def max_power(self) -> float:
+            return max((p for p in self.power if not math.isnan(p)), default=0.0)
 
     base_url: str = "https://api.apsystemsema.com:9282"
     api_app_id: str
@@ -67,67 +113,116 @@ class APSystemsApiBase:
     ) -> None:
         self.api_app_id = api_app_id
         self.api_app_secret = api_app_secret
+        self._secret_bytes = api_app_secret.encode()
         self.sid = sid
         self.ecu_id = ecu_id
         self.session = session
 
-    def _hmac_sha256(self, key: str, message: str) -> str:
-        _hmac = hmac.new(key.encode(), message.encode(), hashlib.sha256)
-        return base64.b64encode(_hmac.digest()).decode("utf-8")
+        system_summary_path = f"/user/api/v2/systems/summary/{sid}"
+        self._system_summary_url = urljoin(self.base_url, system_summary_path)
+        self._system_summary_headers = self._request_headers_fn(
+            "GET", system_summary_path.split("/")[-1]
+        )
+        ecu_minutely_energy_path = (
+            f"/user/api/v2/systems/{sid}/devices/ecu/energy/{ecu_id}"
+        )
+        self._ecu_minutely_energy_url = urljoin(self.base_url, ecu_minutely_energy_path)
+        self._ecu_minutely_energy_headers = self._request_headers_fn(
+            "GET", ecu_minutely_energy_path.split("/")[-1]
+        )
+        self._cache: typing.Dict[
+            str, typing.Tuple[float, typing.Any, typing.Hashable]
+        ] = {}
+
+    def invalidate(self) -> None:
+        """Drop cached payloads so the next call fetches from the API."""
+        self._cache.clear()
 
-    def _request_headers(self, request_method: str, request_path: str) -> str:
+    async def _cached(
+        self,
+        key: str,
+        fetch: typing.Callable[[], typing.Awaitable],
+        scope: typing.Hashable = None,
+    ):
+        """Return a cached payload for key, fetching it when it has expired.
+
+        Entries cached under a different scope (e.g. another day's date_range)
+        are never served, not even as a stale fallback.
+        """
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[2] != scope:
+            cached = None
+        if cached is not None and now - cached[0] < CACHE_TTL:
+            return cached[1]
+        try:
+            value = await fetch()
+        except Exception as exception:  # pylint: disable=broad-except
+            if cached is None or now - cached[0] >= CACHE_MAX_STALE:
+                raise
+            _LOGGER.warning(
+                "Error fetching %s, using cached value - %s", key, exception
+            )
+            return cached[1]
+        self._cache[key] = (now, value, scope)
+        return value
+
+    def _request_headers_fn(
+        self, request_method: str, request_path_tail: str
+    ) -> typing.Callable[[], dict]:
+        """Return a header builder for one endpoint.
+
+        request_method must already be uppercase. Everything except the
+        timestamp and nonce is bound here, once per client.
+        """
+        secret = self._secret_bytes
         X_CA_AppId = self.api_app_id
-        X_CA_Timestamp = f"{int(round(datetime.now().timestamp()))}"
-        X_CA_Nonce = uuid4().hex
-        X_CA_Signature_Method = "HmacSHA256"
-        X_CA_Signature = self._hmac_sha256(
-            self.api_app_secret,
-            "/".join(
-                [
-                    X_CA_Timestamp,
-                    X_CA_Nonce,
-                    X_CA_AppId,
-                    request_path.split("/")[-1],
-                    request_method.upper(),
-                    X_CA_Signature_Method,
-                ]
-            ),
+        X_CA_Signature_Method = SIGNATURE_METHOD
+        signature_suffix = (
+            f"/{X_CA_AppId}/{request_path_tail}/{request_method}/"
+            f"{X_CA_Signature_Method}"
         )
 
-        return {
-            "Content-type": "application/json; charset=UTF-8",
-            "x-ca-appid": X_CA_AppId,
-            "x-ca-timestamp": X_CA_Timestamp,
-            "x-ca-nonce": X_CA_Nonce,
-            "x-ca-signature-method": X_CA_Signature_Method,
-            "x-ca-signature": X_CA_Signature,
-        }
+        def _request_headers() -> dict:
+            X_CA_Timestamp = str(int(time.time()))
+            X_CA_Nonce = secrets.token_hex(16)
+            X_CA_Signature = base64.b64encode(
+                hmac.new(
+                    secret,
+                    f"{X_CA_Timestamp}/{X_CA_Nonce}{signature_suffix}".encode(),
+                    hashlib.sha256,
+                ).digest()
+            ).decode("utf-8")
+
+            return {
+                "Content-type": "application/json; charset=UTF-8",
+                "x-ca-appid": X_CA_AppId,
+                "x-ca-timestamp": X_CA_Timestamp,
+                "x-ca-nonce": X_CA_Nonce,
+                "x-ca-signature-method": X_CA_Signature_Method,
+                "x-ca-signature": X_CA_Signature,
+            }
+
+        return _request_headers
 
     async def _request(
         self, method: str, url: str, data: dict = {}, headers: dict = {}
-    ) -> aiohttp.ClientResponse:
+    ) -> dict | None:
+        method = method.lower()
         try:
             # async with async_timeout.timeout(TIMEOUT, loop=asyncio.get_event_loop()):
             async with async_timeout.timeout(TIMEOUT):
-                if method.lower() == "get":
-                    response = await self.session.get(url, params=data, headers=headers)
-                    response.raise_for_status()
-                    return response
-
-                elif method.lower() == "put":
-                    response = await self.session.put(url, headers=headers, json=data)
-                    response.raise_for_status()
-                    return response
-
-                elif method.lower() == "patch":
-                    response = await self.session.patch(url, headers=headers, json=data)
+                # Read the body inside the timeout and the response context so the
+                # connection is released back to the session pool straight away.
+                async with self.session.request(
+                    method,
+                    url,
+                    params=data if method == "get" else None,
+                    json=data if method != "get" else None,
+                    headers=headers,
+                ) as response:
                     response.raise_for_status()
-                    return response
-
-                elif method.lower() == "post":
-                    response = await self.session.post(url, headers=headers, json=data)
-                    response.raise_for_status()
-                    return response
+                    return orjson.loads(await response.read())
 
         except asyncio.TimeoutError as exception:
             _LOGGER.error(
@@ -136,7 +231,7 @@ class APSystemsApiBase:
                 exception,
             )
 
-        except (KeyError, TypeError) as exception:
+        except (KeyError, TypeError, orjson.JSONDecodeError) as exception:
             _LOGGER.error(
                 "Error parsing information from %s - %s",
                 url,
@@ -151,39 +246,56 @@ class APSystemsApiBase:
         except Exception as exception:  # pylint: disable=broad-except
             _LOGGER.error("Something really wrong happened! - %s", exception)
 
-    async def system_summary(self) -> SystemSummaryData:
-        request_path = "/user/api/v2/systems/summary/{sid}".format(sid=self.sid)
-        url = urljoin(self.base_url, request_path)
-        headers = self._request_headers("GET", request_path)
-        response = await self._request("GET", url, headers=headers)
-        data = await response.json()
-        if data["code"] != 0:
-            raise APSystemsApiBase.ResponseException(
-                "Non zero response code: {data}".format(data=json.dumps(data, indent=4))
+    @staticmethod
+    def _response_data(data: dict | None) -> dict:
+        if not isinstance(data, dict):
+            raise APSystemsApiResponseException(f"Malformed response: {data!r}")
+        if data.get("code") != 0:
+            raise APSystemsApiResponseException(
+                "Non zero response code: {data}".format(
+                    data=orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+                )
             )
-        return APSystemsApiBase.SystemSummaryData(**data["data"])
+        if not isinstance(data.get("data"), dict):
+            raise APSystemsApiResponseException(f"Malformed response: {data!r}")
+        return data["data"]
+
+    async def system_summary(self) -> SystemSummaryData:
+        # today/month/year totals reset at local midnight, so never serve a
+        # payload fetched on another day.
+        return await self._cached(
+            "system_summary",
+            self._fetch_system_summary,
+            scope=date.today().isoformat(),
+        )
+
+    async def _fetch_system_summary(self) -> SystemSummaryData:
+        headers = self._system_summary_headers()
+        data = await self._request("GET", self._system_summary_url, headers=headers)
+        return APSystemsApiBase.SystemSummaryData.from_api(self._response_data(data))
 
     async def ecu_minutely_energy(self) -> ECUMinutelyEnergyData:
-        request_path = "/user/api/v2/systems/{sid}/devices/ecu/energy/{eid}".format(
-            sid=self.sid, eid=self.ecu_id
+        date_range = date.today().isoformat()
+        return await self._cached(
+            "ecu_minutely_energy",
+            functools.partial(self._fetch_ecu_minutely_energy, date_range),
+            scope=date_range,
         )
-        url = urljoin(self.base_url, request_path)
-        headers = self._request_headers("GET", request_path)
-        response = await self._request(
+
+    async def _fetch_ecu_minutely_energy(self, date_range: str) -> ECUMinutelyEnergyData:
+        headers = self._ecu_minutely_energy_headers()
+        data = await self._request(
             "GET", 
-            url,
+            self._ecu_minutely_energy_url,
             data=dict(
                 energy_level="minutely",
-                date_range=(datetime.now()).strftime("%Y-%m-%d"),
+                date_range=date_range,
             ),
             headers=headers
         )
-        data = await response.json()
-        if data["code"] != 0:
-            raise APSystemsApiBase.ResponseException(
-                "Non zero response code: {data}".format(data=json.dumps(data, indent=4))
-            )
-        return APSystemsApiBase.ECUMinutelyEnergyData(**data["data"])
+        return APSystemsApiBase.ECUMinutelyEnergyData.from_api(
+            self._response_data(data)
+        )
 
 # if __name__ == "__main__":
 #     parser = argparse.ArgumentParser()
@@ -213,22 +325,32 @@ class APSystemsApiSystemSummaryClient(APSystemsApiBase):
         ecu_minutely_energy: APSystemsApiBase.ECUMinutelyEnergyData | None
 
     async def async_get_data(self) -> SystemData:
+        # Both endpoints are independent, so fetch them concurrently over the
+        # session's pooled keep-alive connections.
+        system_summary, ecu_minutely_energy = await asyncio.gather(
+            self.system_summary(),
+            self.ecu_minutely_energy(),
+            return_exceptions=True,
+        )
+        for result in (system_summary, ecu_minutely_energy):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
         system_data = APSystemsApiSystemSummaryClient.SystemData(
             system_summary=None,
             ecu_minutely_energy=None,
         )
-        try:
-            system_data.system_summary = await self.system_summary()
-        except Exception as exception:
+        if isinstance(system_summary, BaseException):
             _LOGGER.error(
                 "Error fetching system_summary %s",
-                exception,
+                system_summary,
             )
-        try:
-            system_data.ecu_minutely_energy = await self.ecu_minutely_energy()
-        except Exception as exception:
+        else:
+            system_data.system_summary = system_summary
+        if isinstance(ecu_minutely_energy, BaseException):
             _LOGGER.error(
                 "Error fetching ecu_minutely_energy %s",
-                exception,
+                ecu_minutely_energy,
             )
+        else:
+            system_data.ecu_minutely_energy = ecu_minutely_energy
         return system_data
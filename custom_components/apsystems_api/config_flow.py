@@ -2,7 +2,7 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .api import APSystemsApiSystemSummaryClient
 from .const import CONF_API_APP_ID
@@ -72,7 +72,7 @@ class APSystemsApiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     ):
         """Return true if credentials is valid."""
         try:
-            session = async_create_clientsession(self.hass)
+            session = async_get_clientsession(self.hass)
             client = APSystemsApiSystemSummaryClient(
                 api_app_id=api_app_id,
                 api_app_secret=api_app_secret,
@@ -1,23 +1,12 @@
-import asyncio
 import logging
 from datetime import timedelta
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core_config import Config
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from .api import APSystemsApiSystemSummaryClient
-from .const import CONF_API_APP_ID
-from .const import CONF_API_APP_SECRET
-from .const import CONF_SID
-from .const import CONF_ECU_ID
 from .const import DOMAIN
-from .const import PLATFORMS
-from .const import STARTUP_MESSAGE
 
 SCAN_INTERVAL = timedelta(minutes=60)
 
@@ -37,6 +26,11 @@ class APSystemsApiSystemSummaryDataUpdateCoordinator(DataUpdateCoordinator):
 
         super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
 
+    async def async_request_refresh(self) -> None:
+        """Drop the client's short-lived cache so a requested refresh hits the API."""
+        self.client.invalidate()
+        await super().async_request_refresh()
+
     async def _async_update_data(self):
         """Update data via library."""
         try:
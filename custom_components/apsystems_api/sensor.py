@@ -4,7 +4,6 @@ from .const import DOMAIN
 from .const import ICON
 from .const import SENSOR
 
-from .const import ATTRIBUTION
 from .const import NAME
 from .const import VERSION
 
@@ -101,12 +100,14 @@ class APSystemsApiSystemSummarySensor(APSystemsApiEntity, SensorEntity):
         #     "PAT TEST XYZ %s",
         #     str(self)
         # )
-        _LOGGER.warning(
-            "PAT TEST XYZ %s %s", str(self.coordinator), str(self.coordinator.__class__)
-        )
         data: APSystemsApiSystemSummaryClient.SystemData = self.coordinator.data
-        _LOGGER.warning("PAT TEST XYZ %s", str(data))
-        if data and data.ecu_minutely_energy and (value := getattr(data.ecu_minutely_energy, self.data_key, None)):
+        value = (
+            getattr(data.system_summary, self.data_key, None)
+            if data and data.system_summary
+            else None
+        )
+        _LOGGER.debug("%s state: %s", self.name, value)
+        if value is not None:
             return value
             return self.coordinator.data.month
 
@@ -118,11 +119,7 @@ class APSystemsApiSystemSummarySensor(APSystemsApiEntity, SensorEntity):
 
     @property
     def device_class(self):
-        if self.data_key == "latest_power":
-            return SensorDeviceClass.POWER
-        if self.data_key == "latest_energy":
-            return SensorDeviceClass.POWER
-        return None
+        return SensorDeviceClass.ENERGY
 
     # async def async_update(self) -> None:
     #     """Update the entity.
@@ -188,12 +185,14 @@ class APSystemsApiECUMinutelyEnergyDataSensor(APSystemsApiEntity, SensorEntity):
         #     "PAT TEST XYZ %s",
         #     str(self)
         # )
-        _LOGGER.warning(
-            "PAT TEST XYZ %s %s", str(self.coordinator), str(self.coordinator.__class__)
-        )
         data: APSystemsApiSystemSummaryClient.SystemData = self.coordinator.data
-        _LOGGER.warning("PAT TEST XYZ %s", str(data))
-        if data and data.system_summary and (value := getattr(data.system_summary, self.data_key, None)):
+        value = (
+            getattr(data.ecu_minutely_energy, self.data_key, None)
+            if data and data.ecu_minutely_energy
+            else None
+        )
+        _LOGGER.debug("%s state: %s", self.name, value)
+        if value is not None:
             return value
             return self.coordinator.data.month
 
@@ -205,7 +204,11 @@ class APSystemsApiECUMinutelyEnergyDataSensor(APSystemsApiEntity, SensorEntity):
 
     @property
     def device_class(self):
-        return SensorDeviceClass.ENERGY
+        if self.data_key == "latest_power":
+            return SensorDeviceClass.POWER
+        if self.data_key == "latest_energy":
+            return SensorDeviceClass.ENERGY
+        return None
 
     # async def async_update(self) -> None:
     #     """Update the entity.
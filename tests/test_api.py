@@ -1,87 +1,337 @@
 """Tests for APSystems API api."""
 import asyncio
+import math
+from unittest.mock import patch
 
 import aiohttp
+import pytest
 from custom_components.apsystems_api.api import (
-    APSystemsApi,
+    APSystemsApiBase,
+)
+from custom_components.apsystems_api.api import (
+    CACHE_MAX_STALE,
+)
+from custom_components.apsystems_api.api import (
+    CACHE_TTL,
+)
+from custom_components.apsystems_api.api import (
+    APSystemsApiResponseException,
+)
+from custom_components.apsystems_api.api import (
+    APSystemsApiSystemSummaryClient,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 
+SUMMARY_URL = "https://api.apsystemsema.com:9282/user/api/v2/systems/summary/SID"
+ECU_URL = (
+    "https://api.apsystemsema.com:9282/user/api/v2/systems/SID/devices/ecu/energy/ECU"
+)
+
+
 async def test_api(hass, aioclient_mock, caplog):
     """Test API calls."""
 
     # To test the api submodule, we first create an instance of our API client
-    api = APSystemsApi("test", "test", async_get_clientsession(hass))
+    api = APSystemsApiSystemSummaryClient(
+        api_app_id="app",
+        api_app_secret="secret",
+        sid="SID",
+        ecu_id="ECU",
+        session=async_get_clientsession(hass),
+    )
 
     # Use aioclient_mock which is provided by `pytest_homeassistant_custom_components`
-    # to mock responses to aiohttp requests. In this case we are telling the mock to
-    # return {"test": "test"} when a `GET` call is made to the specified URL. We then
-    # call `async_get_data` which will make that `GET` request.
+    # to mock responses to aiohttp requests. The signed request goes to the
+    # endpoint URL and the decoded JSON body is unwrapped into the payload.
     aioclient_mock.get(
-        "https://jsonplaceholder.typicode.com/posts/1", json={"test": "test"}
+        SUMMARY_URL,
+        json={
+            "code": 0,
+            "data": {"today": "1", "month": "2", "year": "3", "lifetime": "4"},
+        },
     )
-    assert await api.async_get_data() == {"test": "test"}
-
-    # We do the same for `async_set_title`. Note the difference in the mock call
-    # between the previous step and this one. We use `patch` here instead of `get`
-    # because we know that `async_set_title` calls `api_wrapper` with `patch` as the
-    # first parameter
-    aioclient_mock.patch("https://jsonplaceholder.typicode.com/posts/1")
-    assert await api.async_set_title("test") is None
-
-    # In order to get 100% coverage, we need to test `api_wrapper` to test the code
-    # that isn't already called by `async_get_data` and `async_set_title`. Because the
-    # only logic that lives inside `api_wrapper` that is not being handled by a third
-    # party library (aiohttp) is the exception handling, we also want to simulate
-    # raising the exceptions to ensure that the function handles them as expected.
-    # The caplog fixture allows access to log messages in tests. This is particularly
-    # useful during exception handling testing since often the only action as part of
-    # exception handling is a logging statement
-    caplog.clear()
-    aioclient_mock.put(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=asyncio.TimeoutError
+    assert await api.system_summary() == APSystemsApiBase.SystemSummaryData(
+        today="1", month="2", year="3", lifetime="4"
     )
-    assert (
-        await api.api_wrapper("put", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
+    assert aioclient_mock.mock_calls[-1][3]["x-ca-appid"] == "app"
+
+    aioclient_mock.get(
+        ECU_URL,
+        json={
+            "code": 0,
+            "data": {
+                "today": "1.5",
+                "time": ["00:00"],
+                "power": [5],
+                "energy": ["1.5"],
+            },
+        },
     )
+    data = await api.ecu_minutely_energy()
+    assert data.latest_power == 5 and data.latest_energy == 1.5
+    assert aioclient_mock.mock_calls[-1][1].query["energy_level"] == "minutely"
+
+    # The exception handling in `_request` only logs, so check it through the
+    # log messages. The caplog fixture allows access to log messages in tests.
+    aioclient_mock.clear_requests()
+
+    caplog.clear()
+    aioclient_mock.get(SUMMARY_URL, exc=asyncio.TimeoutError)
+    assert await api._request("GET", SUMMARY_URL) is None
     assert (
         len(caplog.record_tuples) == 1
         and "Timeout error fetching information from" in caplog.record_tuples[0][2]
     )
 
     caplog.clear()
-    aioclient_mock.post(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=aiohttp.ClientError
-    )
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
-    )
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(SUMMARY_URL, exc=aiohttp.ClientError)
+    assert await api._request("GET", SUMMARY_URL) is None
     assert (
         len(caplog.record_tuples) == 1
         and "Error fetching information from" in caplog.record_tuples[0][2]
     )
 
+    # A body that is not JSON is logged as a parse error
     caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/2", exc=Exception)
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(SUMMARY_URL, text="<html>Bad Gateway</html>")
+    assert await api._request("GET", SUMMARY_URL) is None
     assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/2")
-        is None
+        len(caplog.record_tuples) == 1
+        and "Error parsing information from" in caplog.record_tuples[0][2]
     )
+
+    # A non zero response code raises with the indented response body
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(SUMMARY_URL, json={"code": 1001, "data": None})
+    api.invalidate()
+    with pytest.raises(
+        APSystemsApiResponseException,
+        match='Non zero response code: {\n  "code": 1001,\n  "data": null\n}',
+    ):
+        await api.system_summary()
+
+    caplog.clear()
+    aioclient_mock.clear_requests()
+    aioclient_mock.post(SUMMARY_URL, exc=Exception)
+    assert await api._request("POST", SUMMARY_URL) is None
     assert (
         len(caplog.record_tuples) == 1
         and "Something really wrong happened!" in caplog.record_tuples[0][2]
     )
 
-    caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/3", exc=TypeError)
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/3")
-        is None
+
+def test_ecu_minutely_energy_from_api():
+    """Test minutely samples are parsed leniently."""
+    data = APSystemsApiBase.ECUMinutelyEnergyData.from_api(
+        {
+            "today": "1.5",
+            "time": ["00:00", "00:01", "00:02", "00:03"],
+            "power": [0, "12.5", None, "7"],
+            "energy": ["0.1", "0.2", "bad", "1.5"],
+        }
     )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Error parsing information from" in caplog.record_tuples[0][2]
+    assert data.latest_power == 7
+    assert data.latest_energy == 1.5
+    assert data.max_power == 12.5
+    assert math.isnan(data.power[2]) and math.isnan(data.energy[2])
+
+    # A trailing garbled sample or an empty day has no latest value
+    data = APSystemsApiBase.ECUMinutelyEnergyData.from_api(
+        {"today": "0", "time": ["00:00"], "power": [None], "energy": ["bad"]}
+    )
+    assert data.latest_power is None
+    assert data.latest_energy is None
+    assert data.max_power == 0.0 and isinstance(data.max_power, float)
+
+    data = APSystemsApiBase.ECUMinutelyEnergyData.from_api(
+        {"today": "0", "time": [], "power": [], "energy": []}
     )
+    assert data.latest_power is None
+    assert data.latest_energy is None
+    assert data.max_power == 0.0 and isinstance(data.max_power, float)
+
+
+def _client() -> APSystemsApiSystemSummaryClient:
+    return APSystemsApiSystemSummaryClient(
+        api_app_id="app",
+        api_app_secret="secret",
+        sid="SID",
+        ecu_id="ECU",
+        session=None,
+    )
+
+
+async def test_async_get_data_errors():
+    """Test one failing endpoint is logged while cancellation propagates."""
+    client = _client()
+    summary = APSystemsApiBase.SystemSummaryData("1", "2", "3", "4")
+
+    with patch.object(client, "system_summary", return_value=summary), patch.object(
+        client, "ecu_minutely_energy", side_effect=ValueError
+    ):
+        data = await client.async_get_data()
+    assert data.system_summary == summary
+    assert data.ecu_minutely_energy is None
+
+    with patch.object(client, "system_summary", side_effect=ValueError), patch.object(
+        client, "ecu_minutely_energy", return_value=None
+    ):
+        data = await client.async_get_data()
+    assert data.system_summary is None
+
+    with patch.object(client, "system_summary", return_value=summary), patch.object(
+        client, "ecu_minutely_energy", side_effect=asyncio.CancelledError
+    ), pytest.raises(asyncio.CancelledError):
+        await client.async_get_data()
+
+
+@pytest.mark.parametrize(
+    "body, match",
+    [
+        (None, "Malformed response"),
+        ([], "Malformed response"),
+        ({"code": 1001, "data": {}}, "Non zero response code"),
+        ({"code": 0}, "Malformed response"),
+        ({"code": 0, "data": []}, "Malformed response"),
+    ],
+)
+def test_response_data_errors(body, match):
+    """Test malformed or failed response envelopes raise."""
+    with pytest.raises(APSystemsApiResponseException, match=match):
+        APSystemsApiBase._response_data(body)
+
+
+def test_system_summary_from_api():
+    """Test the response envelope is unwrapped and extra keys are ignored."""
+    data = APSystemsApiBase._response_data(
+        {
+            "code": 0,
+            "data": {
+                "today": "1",
+                "month": "2",
+                "year": "3",
+                "lifetime": "4",
+                "new_field": "ignored",
+            },
+        }
+    )
+    assert APSystemsApiBase.SystemSummaryData.from_api(
+        data
+    ) == APSystemsApiBase.SystemSummaryData(
+        today="1", month="2", year="3", lifetime="4"
+    )
+
+
+def test_request_headers_known_vectors():
+    """Test request signing against fixed timestamp/nonce vectors."""
+    client = _client()
+    nonce = "0123456789abcdef0123456789abcdef"
+
+    with patch(
+        "custom_components.apsystems_api.api.time.time", return_value=1700000000.4
+    ), patch(
+        "custom_components.apsystems_api.api.secrets.token_hex", return_value=nonce
+    ):
+        assert client._system_summary_headers() == {
+            "Content-type": "application/json; charset=UTF-8",
+            "x-ca-appid": "app",
+            "x-ca-timestamp": "1700000000",
+            "x-ca-nonce": nonce,
+            "x-ca-signature-method": "HmacSHA256",
+            "x-ca-signature": "+wWcOIalE1QMRgf/oT2qJ7X9vZ/3i03dseWwGRBV9cw=",
+        }
+        assert (
+            client._ecu_minutely_energy_headers()["x-ca-signature"]
+            == "0KTKt+RMUjLbh+M801IsBbp98Bn761roksgaXt6Jwbo="
+        )
+
+
+SUMMARY_RESPONSE = {
+    "code": 0,
+    "data": {"today": "1", "month": "2", "year": "3", "lifetime": "4"},
+}
+ECU_RESPONSE = {
+    "code": 0,
+    "data": {"today": "1", "time": ["00:00"], "power": [5], "energy": ["0.1"]},
+}
+
+
+async def test_cache():
+    """Test payloads are cached, refetched and served stale on failure."""
+    client = _client()
+    now = 1000.0
+
+    with patch(
+        "custom_components.apsystems_api.api.time.monotonic",
+        side_effect=lambda: now,
+    ), patch.object(client, "_request", return_value=SUMMARY_RESPONSE) as request:
+        # A hit inside the TTL does not call the API again
+        summary = await client.system_summary()
+        now += CACHE_TTL - 1
+        assert await client.system_summary() is summary
+        assert request.call_count == 1
+
+        # Past the TTL the payload is fetched again
+        now += 1
+        summary = await client.system_summary()
+        assert request.call_count == 2
+
+        # invalidate() forces a fetch inside the TTL
+        client.invalidate()
+        summary = await client.system_summary()
+        assert request.call_count == 3
+
+        # A failed fetch serves the previous payload until CACHE_MAX_STALE
+        request.return_value = None
+        now += CACHE_MAX_STALE - 1
+        assert await client.system_summary() is summary
+        assert request.call_count == 4
+
+        # Once the payload is older than CACHE_MAX_STALE the error is raised
+        now += 1
+        with pytest.raises(APSystemsApiResponseException):
+            await client.system_summary()
+
+
+async def test_cache_ecu_date_range():
+    """Test the previous day's minutely payload is never served."""
+    client = _client()
+
+    with patch("custom_components.apsystems_api.api.date") as mock_date, patch.object(
+        client, "_request", return_value=ECU_RESPONSE
+    ) as request:
+        mock_date.today.return_value.isoformat.return_value = "2026-10-14"
+        energy = await client.ecu_minutely_energy()
+        assert await client.ecu_minutely_energy() is energy
+        assert request.call_count == 1
+        assert request.call_args.kwargs["data"]["date_range"] == "2026-10-14"
+
+        # After midnight the cached payload is neither fresh nor a stale fallback
+        mock_date.today.return_value.isoformat.return_value = "2026-10-15"
+        request.return_value = None
+        with pytest.raises(APSystemsApiResponseException):
+            await client.ecu_minutely_energy()
+        assert request.call_args.kwargs["data"]["date_range"] == "2026-10-15"
+
+
+async def test_cache_system_summary_date():
+    """Test the previous day's summary totals are never served."""
+    client = _client()
+
+    with patch("custom_components.apsystems_api.api.date") as mock_date, patch.object(
+        client, "_request", return_value=SUMMARY_RESPONSE
+    ) as request:
+        mock_date.today.return_value.isoformat.return_value = "2026-10-14"
+        summary = await client.system_summary()
+        assert await client.system_summary() is summary
+        assert request.call_count == 1
+
+        # After midnight the cached totals are neither fresh nor a stale fallback
+        mock_date.today.return_value.isoformat.return_value = "2026-10-15"
+        request.return_value = None
+        with pytest.raises(APSystemsApiResponseException):
+            await client.system_summary()
+        assert request.call_count == 2
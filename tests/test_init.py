@@ -1,4 +1,7 @@
 """Test APSystems API setup process."""
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
 import pytest
 from custom_components.apsystems_api import (
     async_reload_entry,
@@ -63,3 +66,18 @@ async def test_setup_entry_exception(hass, error_on_get_data):
     # an error.
     with pytest.raises(ConfigEntryNotReady):
         assert await async_setup_entry(hass, config_entry)
+
+
+async def test_coordinator_request_refresh_invalidates_cache(hass):
+    """Test a requested refresh drops the client's cache before fetching."""
+    client = MagicMock()
+    client.async_get_data = AsyncMock(return_value=None)
+    coordinator = APSystemsApiSystemSummaryDataUpdateCoordinator(hass, client=client)
+
+    await coordinator.async_request_refresh()
+    await hass.async_block_till_done()
+
+    client.invalidate.assert_called_once()
+    client.async_get_data.assert_awaited_once()
+
+    await coordinator.async_shutdown()